@@ -0,0 +1,163 @@
+""" Shared helpers for talking the Zaber binary protocol over a serial port.
+
+A 'pyserial' module is required to get access to a serial port.
+
+Every command is a 6-byte frame: 1st byte for the device number the command
+is sent to, 2nd byte for the command (see the Zaber binary protocol manual),
+and 4 data bytes read starting from the LSB. The device-specific modules
+build their frames through '_frame'/'_send' and share one cached serial
+connection per port.
+
+"""
+
+import concurrent.futures
+import traceback
+
+import serial
+
+# open serial connections are cached per port, so repeated commands reuse one
+# handle instead of paying the port-open cost on every call
+_PORTS = {}
+
+# writes are handed to a single background thread, overlapping the ~6 ms of
+# wire time per frame at 9600 baud with the encoding of the next command; a
+# single worker keeps the frames in order on the wire
+_WRITER = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+
+def _port(com: str):
+    '''
+    Function returning a cached open serial connection for the given port,
+    opening it on the first use. Zaber devices typically communicate over
+    RS-232 at 9600 baud.
+
+    Parameters
+    ----------
+    com : str
+        Name of the serial port the device chain is connected to.
+
+    Returns
+    -------
+    serial.Serial
+        The open serial connection for the given port.
+
+    '''
+    serialZABER = _PORTS.get(com)
+    if serialZABER is None or not serialZABER.is_open:
+        # replies are fixed 6-byte frames read with 'read(6)', which returns
+        # as soon as the bytes are buffered; the timeout only matters when a
+        # reply is missing, so it is kept short
+        serialZABER = serial.Serial(com, baudrate=9600, timeout=0.2)
+        _PORTS[com] = serialZABER
+    return serialZABER
+
+
+def close_all():
+    '''
+    Function for closing all cached serial connections. Should be called once
+    the communication with the devices is finished.
+
+    Returns
+    -------
+    None.
+
+    '''
+    global _WRITER
+
+    # let any queued writes reach the wire before the handles go away; a
+    # fresh executor replaces the drained one so commands issued after
+    # 'close_all' keep working ('_port' reopens closed ports the same way)
+    _WRITER.shutdown(wait=True)
+    _WRITER = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    for serialZABER in _PORTS.values():
+        serialZABER.close()
+    _PORTS.clear()
+
+
+def _write(com: str, buf):
+    '''
+    Function queueing a write on the background writer thread. The caller
+    can keep encoding the next command while the bytes are clocked out.
+
+    Parameters
+    ----------
+    com : str
+        Name of the serial port the device chain is connected to.
+    buf : bytes or bytearray
+        The frame (or batch of frames) to write.
+
+    Returns
+    -------
+    concurrent.futures.Future
+        Future of the write; callers that must have the bytes on the wire
+        before reading a reply should wait on its result.
+
+    '''
+    future = _WRITER.submit(_port(com).write, buf)
+    # a discarded future would swallow worker-side failures (unplugged
+    # device, write error), so they are always printed as well
+    future.add_done_callback(_report_write_error)
+    return future
+
+
+def _report_write_error(future):
+    '''
+    Callback printing the traceback of a failed background write, so the
+    failure stays visible even when the caller discards the future.
+    '''
+    exc = future.exception()
+    if exc is not None:
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
+
+
+def _frame(device_id: int, cmd: int, data: int = 0) -> bytes:
+    '''
+    Function building one 6-byte command frame. 'to_bytes' emits the four
+    data bytes starting from the LSB and handles negative values natively
+    via two's complement.
+
+    Parameters
+    ----------
+    device_id : int
+        Device ID the command is addressed to (0 sends it to all devices).
+    cmd : int
+        Command number from the Zaber binary protocol manual.
+    data : int, optional
+        Value for the 4 data bytes. The default is 0 for commands that
+        ignore the data bytes.
+
+    Returns
+    -------
+    bytes
+        The 6-byte frame ready to be written to the port.
+
+    '''
+    return bytes((device_id & 0xFF, cmd)) + int(data).to_bytes(4, 'little',
+                                                               signed=True)
+
+
+def _send(com: str, device_id: int, cmd: int, data: int = 0):
+    '''
+    Function building one command frame and queueing it for writing on the
+    cached connection for the given port.
+
+    Parameters
+    ----------
+    com : str
+        Name of the serial port the device chain is connected to.
+    device_id : int
+        Device ID the command is addressed to (0 sends it to all devices).
+    cmd : int
+        Command number from the Zaber binary protocol manual.
+    data : int, optional
+        Value for the 4 data bytes. The default is 0 for commands that
+        ignore the data bytes.
+
+    Returns
+    -------
+    concurrent.futures.Future
+        Future of the write, see '_write'.
+
+    '''
+    return _write(com, _frame(device_id, cmd, data))
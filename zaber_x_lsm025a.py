@@ -12,13 +12,28 @@ functions:
     a parameter.
     * move_to_relative - function for moving the stage to the relative
     position.
+    * move_many - function for moving several stages with a single serial
+    write.
+    * get_current_position - function for querying the current position of
+    the stage.
+    * close_all - function for closing all cached serial connections.
 
 """
 
-import serial
+from _zaber_proto import (_frame, _port, _send, _write,  # noqa: F401
+                          close_all)
 
+_MICROSTEP = 0.047625  # microstep of the model X-LSM025A
+_INV_MICROSTEP = 1.0 / _MICROSTEP  # multiplying by the reciprocal is
+# cheaper than dividing on the hot encoding path
 
-def send_home(device_id: int = 0):
+# the 'send home' frame only varies in its device id byte (command '1'
+# ignores the data bytes), so all 256 frames are built once at import and a
+# call boils down to an index and a write
+_FRAME_HOME = tuple(_frame(i, 0x01) for i in range(256))
+
+
+def send_home(device_id: int = 0, com: str = 'COM5'):
     '''
     Function for sending the stage home. Takes the device ID as a parameter.
 
@@ -30,32 +45,24 @@ def send_home(device_id: int = 0):
             get IDs in a chain starting from 1. Choosing 0 will send the
             command to all devices. The default is 0 to send all devices home.
             Numbers from 0 to 254 are allowed.
+    com : str, optional
+        Name of the serial port the device chain is connected to. The default
+        is 'COM5'.
 
     Returns
     -------
-    None.
+    concurrent.futures.Future
+        Future of the serial write; waiting on its result guarantees the
+        command is on the wire and re-raises any write failure.
 
     '''
-    to_device = bytearray()
-    if device_id == 0:
-        to_device.append(0x00)
-    elif device_id == 1:
-        to_device.append(0x01)
-    elif device_id == 2:
-        to_device.append(0x02)
-    else:
-        to_device.append(0x03)
-
-    to_device.append(0x01)
-    # for the command '1' (send home) the data bytes are ignored, hence they
-    # are left empty
-    to_device.append(0x00)
-    to_device.append(0x00)
-    to_device.append(0x00)
-    to_device.append(0x00)
-
-
-def move_to_relative(rel_pos: int, device_id: int = 1):
+    if not 0 <= device_id <= 254:
+        raise ValueError("device_id must be between 0 and 254")
+
+    return _write(com, _FRAME_HOME[device_id])
+
+
+def move_to_relative(rel_pos: int, device_id: int = 1, com: str = 'COM5'):
     '''
     Function for moving the Zaber X-LSM025A stage to a relative position. Works
     with both negative and positive input values. The communication is done
@@ -71,66 +78,102 @@ def move_to_relative(rel_pos: int, device_id: int = 1):
         Device ID. In the case of multiple devices, by default they should
         get IDs in a chain starting from 1. Choosing 0 will send the command
         to all devices. The default is 1 for the first device connected.
+    com : str, optional
+        Name of the serial port the device chain is connected to. The default
+        is 'COM5'.
+
+    Returns
+    -------
+    concurrent.futures.Future
+        Future of the serial write; waiting on its result guarantees the
+        command is on the wire and re-raises any write failure.
+
+    '''
+    return move_many([(device_id, rel_pos)], com)
+
+
+def move_many(moves: list, com: str = 'COM5'):
+    '''
+    Function for moving several stages with a single serial write. One 6-byte
+    frame per move is packed into a common buffer, so a multi-axis move costs
+    one write call instead of one per axis and the daisy-chained devices
+    start moving closer together in time.
+
+    Parameters
+    ----------
+    moves : list
+        List of (device_id, rel_pos) pairs, one per stage to move. See
+        'move_to_relative' for the meaning of the two values.
+    com : str, optional
+        Name of the serial port the device chain is connected to. The default
+        is 'COM5'.
 
     Returns
     -------
-    None.
+    concurrent.futures.Future
+        Future of the serial write; waiting on its result guarantees the
+        command is on the wire and re-raises any write failure.
 
     '''
-    microstep = 0.047625  # microstep of the model X-LSM025A
-
-    to_device = bytearray()
-    if device_id == 0:
-        to_device.append(0x00)
-    elif device_id == 1:
-        to_device.append(0x01)
-    elif device_id == 2:
-        to_device.append(0x02)
-    else:
-        to_device.append(0x03)
-
-    to_device.append(0x15)  # command number '21' - move to the relative
-    # position
-
-    if rel_pos > 0:
-        data = int(rel_pos / microstep)  # convert the relative position
-        # desired to the internal data for the device
-        data_hex = hex(data)[2:]
-
-        if len(data_hex) == 3:
-            data_hex = '0' + data_hex
-
-        # only 'int' values can be appended to bytearrays; convert the strings
-        # to int
-        to_device.append(int(data_hex[0:2], 16))
-        to_device.append(int(data_hex[2:4], 16))
-
-        # positive values will have first two bytes empty
-        to_device.append(0x00)
-        to_device.append(0x00)
-    else:
-        # if the input is a negative value, signed data should be converted
-        # to unsigned before sending the command to the device
-        data = int(rel_pos / microstep)  # convert the relative position
+    # the buffer is allocated at its final size up front and filled in place,
+    # so building the batch never reallocates
+    to_device = bytearray(6 * len(moves))
+    offset = 0
+    for device_id, rel_pos in moves:
+        if not 0 <= device_id <= 254:
+            raise ValueError("device_id must be between 0 and 254")
+
+        data = int(rel_pos * _INV_MICROSTEP)  # convert the relative position
         # desired to the internal data for the device based on the microstep
         # of the model (X-LSM025A)
-        data_hex = hex(data + (1 << 32))
-        data_hex = data_hex[-4:]
-
-        # only 'int' values can be appended to bytearrays; convert the strings
-        # to int
-        to_device.append(int(data_hex[0:2], 16))
-        to_device.append(int(data_hex[2:4], 16))
-
-        # negative values will have first two bytes of 0xFF from the
-        # signed-to-unsigned conversion
-        to_device.append(0xFF)
-        to_device.append(0xFF)
-
-    # open the appropriate USB port
-    # Zaber devices typically communicate over RS-232 at 9600 baud
-    try:
-        serialZABER = serial.Serial('COM5', baudrate=9600)
-    except serial.SerialException:
-        print("No device has been found at the chosen port")
-    serialZABER.write(to_device)
+
+        to_device[offset:offset + 6] = _frame(device_id, 0x15, data)
+        # command number '21' - move to the relative position
+        offset += 6
+
+    # the background writer clocks the batch out while the caller goes on to
+    # encode the next one
+    return _write(com, to_device)
+
+
+def get_current_position(device_id: int = 1, com: str = 'COM5'):
+    '''
+    Function for querying the current position of the stage. The reply is a
+    fixed 6-byte frame with no terminator, so exactly 6 bytes are read;
+    'read' returns as soon as they are buffered instead of waiting for a
+    newline that never comes. The 4 data bytes are decoded with
+    'int.from_bytes' (the inverse of the 'to_bytes' encoding) and scaled by
+    the microstep, so callers get a position instead of a raw frame.
+
+    Parameters
+    ----------
+    device_id : int, optional
+        Device ID of the stage to query. The default is 1 for the first
+        device connected. Note that 0 would make all devices reply at once.
+    com : str, optional
+        Name of the serial port the device chain is connected to. The default
+        is 'COM5'.
+
+    Returns
+    -------
+    float
+        The current position of the stage, in the same units as the
+        'rel_pos' parameter of 'move_to_relative'.
+
+    '''
+    if not 0 <= device_id <= 254:
+        raise ValueError("device_id must be between 0 and 254")
+
+    # wait on the write future so the query is on the wire before reading
+    _send(com, device_id, 0x3C).result()  # command number '60' - return
+    # current position
+    serialZABER = _port(com)
+    msg = serialZABER.read(6)
+
+    # on timeout 'read' returns whatever arrived; decoding a truncated frame
+    # would silently report position 0.0 for a dead device
+    if len(msg) != 6:
+        raise TimeoutError(f"no reply from device {device_id} on {com}")
+
+    steps = int.from_bytes(msg[2:6], 'little', signed=True)
+    return steps * _MICROSTEP